@@ -10,6 +10,7 @@ from visualization import (
     plot_entity_frequency,
     plot_topic_distribution
 )
+from nlp.sentiment_stream import load_window_snapshot
 
 def local_css(file_name):
     """Inject local CSS from a file."""
@@ -93,7 +94,7 @@ def main():
     
     # Show raw data option (excluding 'id' and 'author_id')
     if st.checkbox("Show raw data"):
-        columns_to_hide = {'id', 'author_id','created_at','text','entities'}
+        columns_to_hide = {'id', 'author_id','created_at','text','entities','query'}
         columns_to_show = [col for col in df.columns if col not in columns_to_hide]
         st.write(df[columns_to_show].head(50))
     
@@ -142,6 +143,36 @@ def main():
     else:
         st.info("No 'entities' column available.")
     
+    # Current sliding-window state published by the sentiment pipeline
+    st.subheader("Live Sentiment Windows")
+    snapshot = load_window_snapshot("data/processed/sentiment_windows.json")
+    if snapshot is None:
+        st.info("No sentiment window snapshot found. Run `python src/nlp/sentiment_stream.py` after merging the datasets.")
+    else:
+        st.markdown(f"**Window ending:** `{snapshot['window_end']}` "
+                    f"({snapshot['window_seconds'] // 60} min window)")
+        dimension = st.selectbox("Window by:", list(snapshot['windows'].keys()))
+        windows = snapshot['windows'][dimension]
+        if windows:
+            rows = [
+                {
+                    dimension: key,
+                    'volume': state['volume'],
+                    'mean_compound': state['mean_compound'],
+                    'baseline_mean_compound': state['baseline_mean_compound'],
+                    **{f"{label}_share": share for label, share in state['label_mix'].items()}
+                }
+                for key, state in windows.items()
+            ]
+            st.write(pd.DataFrame(rows).sort_values('volume', ascending=False).head(50))
+        else:
+            st.info(f"No active '{dimension}' windows.")
+        for alert in reversed(snapshot['alerts'][-10:]):
+            prefix = "(provisional) " if alert.get('provisional') else ""
+            st.warning(f"{prefix}{alert['dimension']} '{alert['key']}': {alert['metric']} "
+                       f"{alert['value']:.3f} vs. baseline {alert['baseline']:.3f} "
+                       f"(window ending {alert['window_end']})")
+    
 
 if __name__ == "__main__":
     main()
@@ -34,7 +34,8 @@ def fetch_recent_tweets(query, max_results=10, retry_count=0):
                     "id": tweet.id,
                     "text": tweet.text,
                     "created_at": tweet.created_at,
-                    "author_id": tweet.author_id
+                    "author_id": tweet.author_id,
+                    "query": query
                 })
         else:
             print("No tweets found for the query.")
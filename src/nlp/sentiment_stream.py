@@ -0,0 +1,534 @@
+# src/nlp/sentiment_stream.py
+import heapq
+import json
+import math
+import os
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+# Dimensions a tweet is aggregated under
+DIMENSIONS = ("query", "keyword", "topic")
+LABELS = ("positive", "neutral", "negative")
+
+def compound_to_label(compound):
+    """
+    Maps a VADER compound score to a discrete sentiment label
+    using the same cut-offs as the dashboard.
+    """
+    if compound >= 0.05:
+        return "positive"
+    if compound <= -0.05:
+        return "negative"
+    return "neutral"
+
+def _to_seconds(timestamp):
+    """
+    Converts a datetime, pandas Timestamp, ISO string or epoch number to epoch seconds.
+    """
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return timestamp.timestamp()
+
+class _Baseline:
+    """
+    Exponentially weighted mean and variance of a window statistic.
+    """
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.mean = None
+        self.var = 0.0
+        self.samples = 0
+
+    def zscore(self, value):
+        std = math.sqrt(self.var)
+        if self.mean is None or std == 0:
+            return None
+        return (value - self.mean) / std
+
+    def update(self, value):
+        self.samples += 1
+        if self.mean is None:
+            self.mean = value
+            return
+        diff = value - self.mean
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+
+class _Window:
+    """
+    Sliding window for a single key, stored as a ring of fixed-width time buckets.
+    Each bucket is [bucket_index, count, compound_sum, positive, neutral, negative].
+    `head` is the bucket the window has been rolled forward to and
+    `last_bucket` the newest bucket holding data.
+    """
+    def __init__(self, num_buckets, alpha, head):
+        self.buckets = deque()
+        self.num_buckets = num_buckets
+        self.count = 0
+        self.compound_sum = 0.0
+        self.label_counts = [0, 0, 0]
+        self.head = head
+        self.last_bucket = None
+        self.volume_baseline = _Baseline(alpha)
+        self.compound_baseline = _Baseline(alpha)
+
+    def expire(self, head):
+        """Drops buckets that have fallen out of the window ending at bucket `head`."""
+        oldest = head - self.num_buckets + 1
+        while self.buckets and self.buckets[0][0] < oldest:
+            _, count, compound_sum, pos, neu, neg = self.buckets.popleft()
+            self.count -= count
+            self.compound_sum -= compound_sum
+            self.label_counts[0] -= pos
+            self.label_counts[1] -= neu
+            self.label_counts[2] -= neg
+        if not self.buckets:
+            # Reset accumulated float error once the window is empty
+            self.compound_sum = 0.0
+
+    def add(self, bucket, compound, label_idx):
+        """
+        Adds one event to its bucket.
+        Returns True if the event is newer than any data already in the window.
+        """
+        newest = self.last_bucket is None or bucket > self.last_bucket
+        if newest:
+            self.last_bucket = bucket
+        if self.buckets and self.buckets[-1][0] == bucket:
+            entry = self.buckets[-1]
+        elif not self.buckets or self.buckets[-1][0] < bucket:
+            entry = [bucket, 0, 0.0, 0, 0, 0]
+            self.buckets.append(entry)
+        else:
+            # Late event: walk back to its bucket (at most num_buckets steps)
+            pos = len(self.buckets) - 1
+            while pos >= 0 and self.buckets[pos][0] > bucket:
+                pos -= 1
+            if pos >= 0 and self.buckets[pos][0] == bucket:
+                entry = self.buckets[pos]
+            else:
+                entry = [bucket, 0, 0.0, 0, 0, 0]
+                self.buckets.insert(pos + 1, entry)
+        entry[1] += 1
+        entry[2] += compound
+        entry[3 + label_idx] += 1
+        self.count += 1
+        self.compound_sum += compound
+        self.label_counts[label_idx] += 1
+        return newest
+
+    def state(self):
+        mean = self.compound_sum / self.count if self.count else 0.0
+        mix = {
+            label: (n / self.count if self.count else 0.0)
+            for label, n in zip(LABELS, self.label_counts)
+        }
+        return {"volume": self.count, "mean_compound": mean, "label_mix": mix}
+
+class SlidingWindowAggregator:
+    """
+    Streams scored tweets into per-query, per-keyword and per-topic sliding windows
+    and raises alerts when a window deviates from its own baseline.
+
+    Every bucket that closes is compared with the key's baseline, including
+    closes where the key was silent, so volume drops are caught too. The
+    baseline itself learns from non-overlapping windows only, one sample per
+    `window_seconds`.
+    Windows are rolled forward lazily: a key's window is only touched when
+    one of its tweets arrives, or when a due-check heap reports that its
+    last tweet has left the window. An update therefore costs O(log n) plus
+    one check per bucket the touched windows have closed, rather than a pass
+    over every key. Memory is bounded by `max_keys` windows per dimension,
+    each holding at most `window_seconds / bucket_seconds` buckets.
+    """
+    def __init__(self, window_seconds=900, bucket_seconds=60, max_keys=1000,
+                 baseline_alpha=0.1, min_baseline_samples=10, z_threshold=4.0,
+                 compound_threshold=None, volume_threshold=None, min_volume=5,
+                 on_alert=None):
+        """
+        Parameters:
+            window_seconds (int): Length of each sliding window.
+            bucket_seconds (int): Granularity at which windows slide.
+            max_keys (int): Maximum tracked keys per dimension (least recently used are evicted).
+            baseline_alpha (float): Smoothing factor of the exponentially weighted baseline.
+            min_baseline_samples (int): Non-overlapping windows needed before alerts fire for a key.
+            z_threshold (float): Absolute z-score that triggers an alert, or None to disable.
+                Windows are checked every bucket, so the default is set high enough
+                to keep a steady stream under about one false alarm a day.
+            compound_threshold (float): Absolute change in mean compound vs. baseline that triggers an alert.
+            volume_threshold (float): Ratio of window volume to baseline volume that triggers an alert.
+            min_volume (int): Windows with fewer tweets than this never alert on sentiment.
+            on_alert (callable): Optional callback invoked with each alert dictionary.
+        """
+        if bucket_seconds <= 0 or window_seconds < bucket_seconds:
+            raise ValueError("window_seconds must be >= bucket_seconds > 0.")
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = int(math.ceil(window_seconds / bucket_seconds))
+        self.max_keys = max_keys
+        self.baseline_alpha = baseline_alpha
+        self.min_baseline_samples = min_baseline_samples
+        self.z_threshold = z_threshold
+        self.compound_threshold = compound_threshold
+        self.volume_threshold = volume_threshold
+        self.min_volume = min_volume
+        self.on_alert = on_alert
+        self.windows = {dim: OrderedDict() for dim in DIMENSIONS}
+        self.head = None
+        self.alerts = deque(maxlen=100)
+        # (due_bucket, dimension, key) entries for windows that will empty out
+        self._due = []
+        # Tweet ids already counted, kept only while they can still fall in a window
+        self._seen_ids = set()
+        self._seen_order = deque()
+
+    def update(self, timestamp, compound, query=None, keywords=(), topic=None, tweet_id=None):
+        """
+        Adds a single scored tweet to every window it belongs to.
+        Tweets whose `tweet_id` has already been counted are ignored.
+        Returns the list of alerts raised by windows that slid forward.
+        """
+        bucket = int(_to_seconds(timestamp) // self.bucket_seconds)
+        alerts = self.advance(bucket * self.bucket_seconds)
+        if bucket <= self.head - self.num_buckets:
+            # Too old to fall inside any current window
+            return alerts
+        if tweet_id is not None:
+            tweet_id = str(tweet_id)
+            if tweet_id in self._seen_ids:
+                return alerts
+            self._seen_ids.add(tweet_id)
+            self._seen_order.append((bucket, tweet_id))
+
+        label_idx = LABELS.index(compound_to_label(compound))
+        keys = []
+        if query:
+            keys.append(("query", str(query)))
+        for kw in keywords or ():
+            kw = kw.strip().lower()
+            if kw:
+                keys.append(("keyword", kw))
+        if topic is not None and not (isinstance(topic, float) and math.isnan(topic)):
+            keys.append(("topic", str(int(topic)) if isinstance(topic, float) else str(topic)))
+
+        rolled = []
+        for dim, value in set(keys):
+            window = self._window(dim, value)
+            rolled.extend(self._roll(dim, value, window, self.head))
+            if window.add(bucket, compound, label_idx):
+                # The window is empty again once this bucket has slid out
+                heapq.heappush(self._due, (bucket + self.num_buckets + 1, dim, value))
+        self._emit(rolled)
+        return alerts + rolled
+
+    def advance(self, timestamp):
+        """
+        Moves the stream clock to `timestamp` without adding data and rolls
+        forward any window whose last tweet has slid out since.
+        Returns the list of alerts raised.
+        """
+        bucket = int(_to_seconds(timestamp) // self.bucket_seconds)
+        if self.head is None or bucket > self.head:
+            self.head = bucket
+
+        oldest = self.head - self.num_buckets
+        while self._seen_order and self._seen_order[0][0] <= oldest:
+            self._seen_ids.discard(self._seen_order.popleft()[1])
+
+        alerts = []
+        while self._due and self._due[0][0] <= self.head:
+            due, dim, value = heapq.heappop(self._due)
+            window = self.windows[dim].get(value)
+            # Skip entries superseded by newer tweets or evicted keys
+            if window is None or window.last_bucket + self.num_buckets + 1 != due:
+                continue
+            alerts.extend(self._roll(dim, value, window, self.head))
+        self._emit(alerts)
+        return alerts
+
+    def flush(self):
+        """
+        Rolls every tracked window forward to the stream clock.
+        This touches every key, so it is meant for publishing snapshots
+        rather than for the per-tweet path. Returns the list of alerts raised.
+        """
+        alerts = []
+        if self.head is not None:
+            for dim, windows in self.windows.items():
+                for value, window in windows.items():
+                    alerts.extend(self._roll(dim, value, window, self.head))
+        self._emit(alerts)
+        return alerts
+
+    def _emit(self, alerts):
+        for alert in alerts:
+            self.alerts.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+
+    def _bucket_time(self, bucket):
+        return datetime.fromtimestamp(bucket * self.bucket_seconds, timezone.utc).isoformat()
+
+    def _window(self, dim, value):
+        windows = self.windows[dim]
+        window = windows.get(value)
+        if window is None:
+            if len(windows) >= self.max_keys:
+                windows.popitem(last=False)
+            window = windows[value] = _Window(self.num_buckets, self.baseline_alpha, self.head)
+        else:
+            windows.move_to_end(value)
+        return window
+
+    def _roll(self, dim, value, window, head):
+        """
+        Closes every bucket between the window's head and `head`, checking
+        each closed window against the baseline. Long silent gaps are capped
+        at one window's worth of closes plus the first empty one.
+        """
+        if head <= window.head:
+            return []
+        alerts = []
+        closes = min(head - window.head, self.num_buckets + 1)
+        for bucket in range(window.head, window.head + closes):
+            window.expire(bucket)
+            alerts.extend(self._check(dim, value, window, bucket))
+        window.head = head
+        window.expire(head)
+        return alerts
+
+    def _check(self, dim, value, window, bucket, provisional=False):
+        """
+        Compares the window ending at the closing `bucket` with its baseline.
+        Only windows ending on a `window_seconds` boundary are folded into the
+        baseline: consecutive sliding windows share all but one bucket, and
+        sampling each of them would understate the baseline's variance.
+
+        A provisional check looks at the window ending at the still-open
+        bucket: it never touches the baseline, and since the open bucket is
+        only partly filled it does not report low volume.
+        """
+        state = window.state()
+        window_end = self._bucket_time(bucket + 1)
+        checks = [("volume", state["volume"], window.volume_baseline)]
+        if state["volume"] >= self.min_volume:
+            checks.append(("mean_compound", state["mean_compound"], window.compound_baseline))
+
+        alerts = []
+        for metric, observed, baseline in checks:
+            reasons = []
+            ready = baseline.samples >= self.min_baseline_samples
+            z = baseline.zscore(observed) if ready else None
+            if provisional and metric == "volume" and z is not None and z < 0:
+                z = None
+            if self.z_threshold is not None and z is not None and abs(z) >= self.z_threshold:
+                reasons.append("zscore")
+            if ready and metric == "mean_compound" and self.compound_threshold is not None \
+                    and abs(observed - baseline.mean) >= self.compound_threshold:
+                reasons.append("threshold")
+            if ready and metric == "volume" and self.volume_threshold is not None \
+                    and baseline.mean > 0 and observed / baseline.mean >= self.volume_threshold:
+                reasons.append("threshold")
+            if reasons:
+                alerts.append({
+                    "dimension": dim,
+                    "key": value,
+                    "metric": metric,
+                    "value": observed,
+                    "baseline": baseline.mean,
+                    "zscore": z,
+                    "reasons": reasons,
+                    "window_end": window_end,
+                    "provisional": provisional,
+                })
+            if not provisional and (bucket + 1) % self.num_buckets == 0:
+                baseline.update(observed)
+        return alerts
+
+    def snapshot(self, dimension=None):
+        """
+        Returns the current state of every tracked window as a JSON-serializable dictionary.
+        Besides the alerts raised by closed buckets, `alerts` includes provisional
+        alerts for the window ending at the open bucket, so a spike in the latest
+        tweets shows up without waiting for the clock to move on.
+        """
+        self.flush()
+        dims = [dimension] if dimension else DIMENSIONS
+        windows = {}
+        provisional = []
+        for dim in dims:
+            windows[dim] = {}
+            for value, window in self.windows[dim].items():
+                if window.count:
+                    provisional.extend(self._check(dim, value, window, self.head, provisional=True))
+                    state = window.state()
+                    state["baseline_mean_compound"] = window.compound_baseline.mean
+                    state["baseline_volume"] = window.volume_baseline.mean
+                    windows[dim][value] = state
+        window_end = None
+        if self.head is not None:
+            window_end = self._bucket_time(self.head + 1)
+        return {
+            "window_seconds": self.window_seconds,
+            "bucket_seconds": self.bucket_seconds,
+            "window_end": window_end,
+            "windows": windows,
+            "alerts": list(self.alerts) + provisional,
+        }
+
+    def save_snapshot(self, filepath):
+        """
+        Writes the current window state to a JSON file for the dashboard.
+        The file is replaced atomically so readers never see a partial write.
+        Returns the snapshot that was written.
+        """
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_path = filepath + ".tmp"
+        snapshot = self.snapshot()
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, filepath)
+        return snapshot
+
+    def save_state(self, filepath):
+        """
+        Persists windows, baselines, recent tweet ids and alerts so a later
+        run can resume the stream with `load_state`.
+        """
+        windows = {
+            dim: [
+                {
+                    "key": value,
+                    "head": window.head,
+                    "last_bucket": window.last_bucket,
+                    "buckets": list(window.buckets),
+                    "volume_baseline": vars(window.volume_baseline),
+                    "compound_baseline": vars(window.compound_baseline),
+                }
+                for value, window in self.windows[dim].items()
+            ]
+            for dim in DIMENSIONS
+        }
+        state = {
+            "window_seconds": self.window_seconds,
+            "bucket_seconds": self.bucket_seconds,
+            "head": self.head,
+            "windows": windows,
+            "seen_ids": list(self._seen_order),
+            "alerts": list(self.alerts),
+        }
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, filepath)
+
+    def load_state(self, filepath):
+        """
+        Restores state written by `save_state`.
+        Returns False if there is no saved state yet.
+        """
+        try:
+            with open(filepath) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        if (state["window_seconds"], state["bucket_seconds"]) != (self.window_seconds, self.bucket_seconds):
+            raise ValueError("Saved aggregator state uses a different window or bucket size.")
+
+        self.head = state["head"]
+        self.windows = {dim: OrderedDict() for dim in DIMENSIONS}
+        self._due = []
+        for dim in DIMENSIONS:
+            for saved in state["windows"][dim][-self.max_keys:]:
+                window = _Window(self.num_buckets, self.baseline_alpha, saved["head"])
+                for entry in saved["buckets"]:
+                    window.buckets.append(entry)
+                    window.count += entry[1]
+                    window.compound_sum += entry[2]
+                    for i in range(3):
+                        window.label_counts[i] += entry[3 + i]
+                window.last_bucket = saved["last_bucket"]
+                window.volume_baseline.__dict__.update(saved["volume_baseline"])
+                window.compound_baseline.__dict__.update(saved["compound_baseline"])
+                self.windows[dim][saved["key"]] = window
+                if window.last_bucket is not None:
+                    heapq.heappush(self._due, (window.last_bucket + self.num_buckets + 1, dim, saved["key"]))
+        self._seen_order = deque((bucket, tweet_id) for bucket, tweet_id in state["seen_ids"])
+        self._seen_ids = {tweet_id for _, tweet_id in self._seen_order}
+        self.alerts = deque(state["alerts"], maxlen=self.alerts.maxlen)
+        return True
+
+def load_window_snapshot(filepath):
+    """
+    Loads a window snapshot written by SlidingWindowAggregator.save_snapshot.
+    Returns None if no snapshot has been written yet.
+    """
+    try:
+        with open(filepath) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def feed_dataframe(aggregator, df, date_col='created_at', sentiment_col='vader_compound',
+                   query_col='query', keyword_col='keywords', topic_col='dominant_topic',
+                   id_col='id'):
+    """
+    Streams the rows of a scored tweet DataFrame into the aggregator in time order.
+    Rows older than the aggregator's current window, or whose id it has
+    already counted, are skipped.
+    Returns the list of alerts raised.
+    """
+    import pandas as pd
+
+    if date_col not in df.columns or sentiment_col not in df.columns:
+        raise KeyError(f"DataFrame must have '{date_col}' and '{sentiment_col}' columns.")
+
+    times = pd.to_datetime(df[date_col], errors='coerce', utc=True)
+    rows = df.assign(_ts=times).dropna(subset=['_ts', sentiment_col]).sort_values('_ts')
+    if aggregator.head is not None:
+        # Only tweets that can still land in a live window are replayed
+        oldest = (aggregator.head - aggregator.num_buckets + 1) * aggregator.bucket_seconds
+        rows = rows[rows['_ts'] >= pd.Timestamp(oldest, unit='s', tz='UTC')]
+    alerts = []
+    for _, row in rows.iterrows():
+        keywords = row[keyword_col] if keyword_col in rows.columns else ""
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        elif not isinstance(keywords, (list, tuple)):
+            keywords = ()
+        alerts.extend(aggregator.update(
+            row['_ts'],
+            float(row[sentiment_col]),
+            query=row[query_col] if query_col in rows.columns and pd.notnull(row[query_col]) else None,
+            keywords=keywords,
+            topic=row[topic_col] if topic_col in rows.columns and pd.notnull(row[topic_col]) else None,
+            tweet_id=row[id_col] if id_col in rows.columns else None,
+        ))
+    return alerts
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    # The master file carries sentiment, keywords, query and dominant topic together
+    input_path = "data/processed/tweets_master.csv"
+    state_path = "data/processed/sentiment_windows_state.json"
+    snapshot_path = "data/processed/sentiment_windows.json"
+    df = pd.read_csv(input_path)
+
+    aggregator = SlidingWindowAggregator()
+    aggregator.load_state(state_path)
+    alerts = feed_dataframe(aggregator, df)
+    # Roll every key up to the clock so their closed buckets are checked too
+    alerts += aggregator.flush()
+    snapshot = aggregator.save_snapshot(snapshot_path)
+    alerts += [alert for alert in snapshot["alerts"] if alert.get("provisional")]
+    for alert in alerts:
+        kind = "Provisional sentiment alert" if alert.get("provisional") else "Sentiment alert"
+        print(f"{kind} [{alert['dimension']}={alert['key']}]: "
+              f"{alert['metric']} {alert['value']:.3f} vs. baseline {alert['baseline']:.3f}")
+    aggregator.save_state(state_path)
+    print(f"Sentiment windows saved to {snapshot_path}")
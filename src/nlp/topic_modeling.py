@@ -1,4 +1,7 @@
 # src/nlp/topic_modeling.py
+import json
+import os
+from itertools import chain, islice
 from gensim import corpora, models
 import nltk
 from nltk.corpus import stopwords
@@ -39,6 +42,224 @@ def perform_lda(tokenized_texts, num_topics=5):
     lda_model = models.LdaModel(corpus, num_topics=num_topics, id2word=dictionary, passes=10)
     return lda_model, dictionary, corpus
 
+class LdaCorpusCache:
+    """
+    Persistent bag-of-words corpus and dictionary for LDA topic modeling.
+
+    Documents are tokenized once and stored as integer-id Matrix Market shards
+    (with their document ids) next to a saved gensim dictionary. Each append
+    writes its documents to new shards of at most `max_shard_docs`, leaving
+    existing shards untouched. Once more than `compact_after` partly filled
+    shards have built up at the end of the cache, they are compacted into
+    full-size ones. Full shards are never rewritten, so the file count stays
+    proportional to the corpus size and compaction only ever rewrites the
+    partly filled tail, once every `compact_after` appends at most.
+    Iterating the cache streams documents from disk one at a time, so it can be
+    passed directly to gensim models without loading the corpus into memory.
+
+    New and compacted shards are written under fresh names and only become
+    visible when the manifest is atomically replaced, so a crash part way
+    through an append leaves the previous state readable.
+    """
+    MANIFEST = "manifest.json"
+    DICTIONARY = "dictionary.gensim"
+
+    def __init__(self, cache_dir, max_shard_docs=100000, compact_after=16):
+        self.cache_dir = cache_dir
+        self.max_shard_docs = max_shard_docs
+        self.compact_after = compact_after
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest_path = os.path.join(cache_dir, self.MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            self.shards = manifest["shards"]
+            self.next_shard = manifest.get("next_shard", len(self.shards))
+            self.dictionary = corpora.Dictionary.load(os.path.join(cache_dir, self.DICTIONARY))
+        else:
+            self.shards = []
+            self.next_shard = 0
+            self.dictionary = corpora.Dictionary()
+
+    def __len__(self):
+        return sum(shard["num_docs"] for shard in self.shards)
+
+    def __iter__(self):
+        for shard in self.shards:
+            corpus = corpora.MmCorpus(self._path(shard["name"]))
+            for doc_bow in islice(corpus, shard["num_docs"]):
+                yield doc_bow
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _shard_ids(self, shard):
+        with open(self._path(shard["name"]) + ".ids") as f:
+            for line in islice(f, shard["num_docs"]):
+                yield line.rstrip("\n")
+
+    def doc_ids(self):
+        """
+        Yields the document ids in corpus order.
+        """
+        for shard in self.shards:
+            yield from self._shard_ids(shard)
+
+    def documents(self, doc_ids):
+        """
+        Yields (doc_id, bag-of-words) for the requested ids in corpus order,
+        reading each document directly through the shard's offset index.
+        """
+        wanted = {str(doc_id) for doc_id in doc_ids}
+        for shard in self.shards:
+            positions = [
+                (pos, doc_id) for pos, doc_id in enumerate(self._shard_ids(shard))
+                if doc_id in wanted
+            ]
+            if not positions:
+                continue
+            corpus = corpora.MmCorpus(self._path(shard["name"]))
+            for pos, doc_id in positions:
+                yield doc_id, corpus[pos]
+
+    def append(self, texts, doc_ids):
+        """
+        Tokenizes new documents and appends them to the cache as new shards.
+        Existing shards are not rewritten, and term ids already in the
+        dictionary are never reassigned.
+
+        Parameters:
+            texts (iterable): Raw text strings to add.
+            doc_ids (iterable): An id for each text, stored alongside the corpus.
+
+        Returns:
+            int: The number of documents appended.
+        """
+        pairs = iter(zip(texts, doc_ids))
+        new_shards = []
+        while True:
+            # Peek so no shard is opened once the input is exhausted
+            try:
+                first = next(pairs)
+            except StopIteration:
+                break
+            batch = chain([first], islice(pairs, self.max_shard_docs - 1))
+            new_shards.append(self._write_shard(
+                (str(doc_id), self.dictionary.doc2bow(preprocess_for_lda([text])[0], allow_update=True))
+                for text, doc_id in batch
+            ))
+        if not new_shards:
+            return 0
+
+        self.shards.extend(new_shards)
+        stale = self._compact()
+        self._save_metadata()
+        self._remove_shards(stale)
+        return sum(shard["num_docs"] for shard in new_shards)
+
+    def _compact(self):
+        """
+        Merges the trailing run of partly filled shards into full-size shards
+        once it is longer than `compact_after`.
+        Returns the replaced shards, whose files can be deleted once the
+        manifest no longer refers to them.
+        """
+        start = len(self.shards)
+        while start > 0 and self.shards[start - 1]["num_docs"] < self.max_shard_docs:
+            start -= 1
+        stale = self.shards[start:]
+        if len(stale) <= self.compact_after:
+            return []
+
+        def stream_docs():
+            for shard in stale:
+                corpus = corpora.MmCorpus(self._path(shard["name"]))
+                yield from zip(self._shard_ids(shard), islice(corpus, shard["num_docs"]))
+
+        docs = stream_docs()
+        merged = []
+        while True:
+            try:
+                first = next(docs)
+            except StopIteration:
+                break
+            merged.append(self._write_shard(chain([first], islice(docs, self.max_shard_docs - 1))))
+        self.shards[start:] = merged
+        return stale
+
+    def _write_shard(self, docs):
+        """
+        Writes (doc_id, bag-of-words) pairs to a new shard and returns its manifest entry.
+        """
+        name = f"corpus_{self.next_shard:05d}.mm"
+        self.next_shard += 1
+        shard_path = self._path(name)
+        tmp_path = shard_path + ".tmp"
+        ids = []
+
+        def stream_bows():
+            for doc_id, doc_bow in docs:
+                ids.append(doc_id)
+                yield doc_bow
+
+        # Term count is taken from the shard itself since the dictionary grows while writing
+        corpora.MmCorpus.serialize(tmp_path, stream_bows())
+        with open(tmp_path + ".ids", "w") as f:
+            f.writelines(doc_id + "\n" for doc_id in ids)
+        for suffix in ("", ".index", ".ids"):
+            os.replace(tmp_path + suffix, shard_path + suffix)
+        return {"name": name, "num_docs": len(ids)}
+
+    def _save_metadata(self):
+        tmp_path = self._path(self.DICTIONARY) + ".tmp"
+        self.dictionary.save(tmp_path)
+        os.replace(tmp_path, self._path(self.DICTIONARY))
+        tmp_path = self._path(self.MANIFEST) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"shards": self.shards, "next_shard": self.next_shard}, f)
+        os.replace(tmp_path, self._path(self.MANIFEST))
+
+    def _remove_shards(self, shards):
+        for shard in shards:
+            for suffix in ("", ".index", ".ids"):
+                path = self._path(shard["name"]) + suffix
+                if os.path.exists(path):
+                    os.remove(path)
+
+def perform_lda_streaming(corpus_cache, num_topics=5, chunksize=2000, workers=1):
+    """
+    Performs LDA topic modeling by streaming a cached corpus from disk.
+    With more than one worker, training runs on gensim's multicore LDA.
+    
+    Parameters:
+        corpus_cache (LdaCorpusCache): The on-disk corpus and dictionary.
+        num_topics (int): Number of topics to extract.
+        chunksize (int): Number of documents held in memory per training chunk.
+        workers (int): Number of CPUs to train with.
+    
+    Returns:
+        tuple: (lda_model, dictionary, corpus)
+    """
+    if workers > 1:
+        # LdaMulticore's workers are in addition to the master process
+        lda_model = models.LdaMulticore(
+            corpus_cache,
+            num_topics=num_topics,
+            id2word=corpus_cache.dictionary,
+            passes=10,
+            chunksize=chunksize,
+            workers=workers - 1
+        )
+    else:
+        lda_model = models.LdaModel(
+            corpus_cache,
+            num_topics=num_topics,
+            id2word=corpus_cache.dictionary,
+            passes=10,
+            chunksize=chunksize
+        )
+    return lda_model, corpus_cache.dictionary, corpus_cache
+
 # Example usage for testing
 if __name__ == "__main__":
     sample_texts = [
@@ -2,7 +2,12 @@
 import pandas as pd
 import os
 from gensim import corpora, models
-from topic_modeling import preprocess_for_lda, perform_lda  # Import functions from topic_modeling.py
+from topic_modeling import (  # Import functions from topic_modeling.py
+    preprocess_for_lda,
+    perform_lda,
+    perform_lda_streaming,
+    LdaCorpusCache
+)
 
 def assign_dominant_topic(lda_model, corpus):
     """
@@ -16,13 +21,16 @@ def assign_dominant_topic(lda_model, corpus):
         dominant_topics.append(dominant_topic)
     return dominant_topics
 
-def run_topic_modeling(input_csv, output_csv, num_topics=5):
+def run_topic_modeling(input_csv, output_csv, num_topics=5, cache_dir=None, workers=1):
     # Load cleaned tweets
     df = pd.read_csv(input_csv)
     
     if 'cleaned_text' not in df.columns:
         raise KeyError("DataFrame must have a 'cleaned_text' column for topic modeling.")
     
+    if cache_dir is not None:
+        return run_topic_modeling_cached(df, output_csv, cache_dir, num_topics=num_topics, workers=workers)
+    
     texts = df['cleaned_text'].tolist()
     tokenized_texts = preprocess_for_lda(texts)
     
@@ -42,7 +50,42 @@ def run_topic_modeling(input_csv, output_csv, num_topics=5):
     df.to_csv(output_csv, index=False)
     print(f"Dominant topics assigned and saved to {output_csv}")
 
+def run_topic_modeling_cached(df, output_csv, cache_dir, num_topics=5, workers=1):
+    """
+    Runs topic modeling against the persistent corpus cache.
+    Only tweets not already in the cache are tokenized; training and
+    dominant topic assignment stream the corpus from disk.
+    """
+    if 'id' not in df.columns:
+        raise KeyError("DataFrame must have an 'id' column to use the corpus cache.")
+    
+    corpus_cache = LdaCorpusCache(cache_dir)
+    cached_ids = set(corpus_cache.doc_ids())
+    new_rows = df[~df['id'].astype(str).isin(cached_ids)].drop_duplicates('id')
+    appended = corpus_cache.append(new_rows['cleaned_text'].fillna(''), new_rows['id'])
+    print(f"Appended {appended} new tweets to corpus cache ({len(corpus_cache)} total)")
+    
+    lda_model, dictionary, corpus = perform_lda_streaming(corpus_cache, num_topics=num_topics, workers=workers)
+    
+    topics = lda_model.print_topics(num_words=5)
+    print("LDA Topics:")
+    for topic in topics:
+        print(topic)
+    
+    # Run inference only on the tweets in this file, read by offset from the cache
+    documents = list(corpus_cache.documents(df['id'].astype(str)))
+    dominant_topics = assign_dominant_topic(lda_model, [doc_bow for _, doc_bow in documents])
+    topic_by_id = dict(zip((doc_id for doc_id, _ in documents), dominant_topics))
+    df['dominant_topic'] = df['id'].astype(str).map(topic_by_id).fillna(-1).astype(int)
+    
+    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
+    df.to_csv(output_csv, index=False)
+    print(f"Dominant topics assigned and saved to {output_csv}")
+
 if __name__ == "__main__":
     input_path = "data/processed/tweets_cleaned.csv"
     output_path = "data/processed/tweets_with_topics.csv"
-    run_topic_modeling(input_path, output_path, num_topics=5)
+    cache_path = "data/processed/lda_cache"
+    # Use the CPU share given by the pipeline runner, if any
+    workers = int(os.getenv("PIPELINE_CPUS", 1))
+    run_topic_modeling(input_path, output_path, num_topics=5, cache_dir=cache_path, workers=workers)
@@ -0,0 +1,327 @@
+# src/pipeline.py
+import argparse
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+STATE_PATH = os.path.join("data", "processed", ".pipeline_state.json")
+
+class Stage:
+    """
+    A pipeline step run as its own process.
+    `inputs`, `outputs` and `code` are file paths; `deps` are the names of
+    stages that must finish first, and `cpus` is the share of the CPU budget
+    the stage reserves while it runs. The share is passed to the stage in the
+    PIPELINE_CPUS environment variable so it can size its own worker pool.
+    """
+    def __init__(self, name, script, inputs, outputs, code=(), deps=(), cpus=1):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = [script] + list(code)
+        self.deps = list(deps)
+        self.cpus = cpus
+
+    def command(self):
+        return [sys.executable, self.script]
+
+# Default DAG: sentiment, NER and topics only depend on the cleaned tweets.
+# Topics is listed first as it is usually the slowest branch.
+STAGES = [
+    Stage(
+        "preprocessing", "src/preprocessing.py",
+        inputs=["data/raw/tweets.csv"],
+        outputs=["data/processed/tweets_cleaned.csv"],
+    ),
+    Stage(
+        "topics", "src/nlp/topic_modeling_integration.py",
+        inputs=["data/processed/tweets_cleaned.csv"],
+        outputs=["data/processed/tweets_with_topics.csv"],
+        code=["src/nlp/topic_modeling.py"],
+        deps=["preprocessing"],
+        cpus=2,
+    ),
+    Stage(
+        "sentiment", "src/nlp/sentiment_analysis.py",
+        inputs=["data/processed/tweets_cleaned.csv"],
+        outputs=["data/processed/tweets_sentiment.csv"],
+        deps=["preprocessing"],
+    ),
+    Stage(
+        "ner", "src/nlp/ner.py",
+        inputs=["data/processed/tweets_cleaned.csv"],
+        outputs=["data/processed/tweets_with_entities.csv"],
+        deps=["preprocessing"],
+    ),
+    Stage(
+        "master", "src/master_csv.py",
+        inputs=[
+            "data/processed/tweets_sentiment.csv",
+            "data/processed/tweets_with_entities.csv",
+            "data/processed/tweets_with_topics.csv",
+        ],
+        outputs=["data/processed/tweets_master.csv"],
+        deps=["sentiment", "ner", "topics"],
+    ),
+    Stage(
+        "windows", "src/nlp/sentiment_stream.py",
+        inputs=["data/processed/tweets_master.csv"],
+        # The state file is carried between runs, so it is tracked as an output only
+        outputs=["data/processed/sentiment_windows.json", "data/processed/sentiment_windows_state.json"],
+        deps=["master"],
+    ),
+]
+
+def file_digest(path):
+    """
+    Returns the SHA-256 hex digest of a file's contents, or None if it does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def stage_fingerprint(stage):
+    """
+    Fingerprints a stage by its command and the contents of its inputs and code.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(stage.command()[1:]).encode())
+    for path in sorted(stage.inputs + stage.code):
+        h.update(path.encode())
+        h.update((file_digest(path) or "missing").encode())
+    return h.hexdigest()
+
+def topological_order(stages):
+    """
+    Orders stages so every stage comes after its dependencies.
+    Raises ValueError on unknown dependencies or cycles.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    order, visiting, done = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Dependency cycle detected at stage '{stage.name}'.")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'.")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+def critical_path(stages, durations, status=None):
+    """
+    Finds the longest chain of dependent stages by elapsed time.
+    When `status` is given, only stages that ran or were skipped are
+    considered, so failed or blocked branches never show up in the path.
+    Returns (list of stage names, total seconds).
+    """
+    if status is not None:
+        completed = {name for name, s in status.items() if s in ("ran", "skipped")}
+        stages = [
+            Stage(stage.name, stage.script, stage.inputs, stage.outputs,
+                  deps=[dep for dep in stage.deps if dep in completed])
+            for stage in stages if stage.name in completed
+        ]
+    finish, previous = {}, {}
+    for stage in topological_order(stages):
+        # Start from the first dependency so skipped (zero-time) stages still chain
+        prev = stage.deps[0] if stage.deps else None
+        start = finish[prev] if prev else 0.0
+        for dep in stage.deps[1:]:
+            if finish[dep] > start:
+                start, prev = finish[dep], dep
+        finish[stage.name] = start + durations.get(stage.name, 0.0)
+        previous[stage.name] = prev
+    if not finish:
+        return [], 0.0
+    # On ties prefer the most downstream stage so the path runs to the end of the DAG
+    name = max(reversed(list(finish)), key=finish.get)
+    total = finish[name]
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return path[::-1], total
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(state, path=STATE_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def is_up_to_date(stage, state):
+    """
+    A stage can be skipped when its fingerprint matches the last successful run
+    and its outputs are still exactly what that run produced.
+    """
+    previous = state.get(stage.name)
+    if not previous or previous["fingerprint"] != stage_fingerprint(stage):
+        return False
+    return all(file_digest(path) == previous["outputs"].get(path) for path in stage.outputs)
+
+def _run_stage(stage, cpus, results):
+    env = dict(os.environ)
+    env["PIPELINE_CPUS"] = str(cpus)
+    # Keep numeric libraries inside the stage's CPU share
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        env[var] = str(cpus)
+    start = time.time()
+    returncode = 1
+    try:
+        returncode = subprocess.run(stage.command(), env=env).returncode
+    except Exception as e:
+        print(f"[{stage.name}] could not be started: {e}")
+    finally:
+        # Always report back, otherwise the scheduler would wait forever
+        results.put((stage.name, returncode, time.time() - start))
+
+def run_pipeline(stages=STAGES, max_cpus=None, force=False, state_path=STATE_PATH, cpus=None):
+    """
+    Runs the stage DAG, launching every stage whose dependencies have finished
+    as long as its CPU share fits in the remaining budget.
+    Ready stages are launched longest first, using durations from the previous run.
+    Up-to-date stages are skipped.
+
+    Parameters:
+        stages (list): The Stage objects making up the pipeline.
+        max_cpus (int): Total CPUs shared by concurrently running stages (defaults to all).
+        force (bool): Re-run every stage even if it is up to date.
+        state_path (str): Where stage fingerprints are persisted between runs.
+        cpus (dict): Optional per-stage CPU shares overriding each Stage's `cpus`.
+
+    Returns:
+        dict: Mapping of stage name to "ran", "skipped", "failed" or "blocked".
+    """
+    max_cpus = max_cpus or os.cpu_count() or 1
+    cpus = cpus or {}
+    unknown = set(cpus) - {stage.name for stage in stages}
+    if unknown:
+        raise ValueError(f"CPU shares given for unknown stages: {', '.join(sorted(unknown))}")
+    state = load_state(state_path)
+    # Stages that took longest last time go first so slow branches start early
+    order = sorted(
+        topological_order(stages),
+        key=lambda stage: state.get(stage.name, {}).get("duration", 0.0),
+        reverse=True
+    )
+    status, durations, fingerprints = {}, {}, {}
+    # Stages already found out of date, so waiting for CPUs does not re-hash them
+    stale = set()
+    results = queue.Queue()
+    running, free_cpus = {}, max_cpus
+    pipeline_start = time.time()
+
+    while len(status) < len(order):
+        # Launch or skip every stage whose dependencies have all completed,
+        # rescanning after any skip or block since that can make further stages ready
+        changed = True
+        while changed:
+            changed = False
+            for stage in order:
+                if stage.name in status or stage.name in running:
+                    continue
+                dep_status = [status.get(dep) for dep in stage.deps]
+                if any(s in ("failed", "blocked") for s in dep_status):
+                    status[stage.name] = "blocked"
+                    print(f"[{stage.name}] blocked by a failed dependency")
+                    changed = True
+                    continue
+                if not all(s in ("ran", "skipped") for s in dep_status):
+                    continue
+                if not force and stage.name not in stale and is_up_to_date(stage, state):
+                    status[stage.name] = "skipped"
+                    durations[stage.name] = 0.0
+                    print(f"[{stage.name}] up to date, skipping")
+                    changed = True
+                    continue
+                stale.add(stage.name)
+                share = max(1, min(cpus.get(stage.name, stage.cpus), max_cpus))
+                if share > free_cpus:
+                    continue
+                free_cpus -= share
+                # Inputs are final once dependencies are done, so fingerprint at launch
+                fingerprints[stage.name] = stage_fingerprint(stage)
+                print(f"[{stage.name}] starting ({share} CPU{'s' if share > 1 else ''})")
+                thread = threading.Thread(target=_run_stage, args=(stage, share, results), daemon=True)
+                running[stage.name] = (stage, share)
+                thread.start()
+
+        if not running:
+            continue
+
+        name, returncode, elapsed = results.get()
+        stage, share = running.pop(name)
+        free_cpus += share
+        durations[name] = elapsed
+        if returncode == 0:
+            status[name] = "ran"
+            state[name] = {
+                "fingerprint": fingerprints[name],
+                "outputs": {path: file_digest(path) for path in stage.outputs},
+                "duration": elapsed,
+            }
+            save_state(state, state_path)
+            print(f"[{name}] finished in {elapsed:.1f}s")
+        else:
+            status[name] = "failed"
+            state.pop(name, None)
+            save_state(state, state_path)
+            print(f"[{name}] failed with exit code {returncode} after {elapsed:.1f}s")
+
+    wall_time = time.time() - pipeline_start
+    path, path_time = critical_path(stages, durations, status)
+    print(f"Pipeline finished in {wall_time:.1f}s")
+    if path:
+        print(f"Critical path: {' -> '.join(path)} ({path_time:.1f}s)")
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the tweet processing pipeline.")
+    parser.add_argument("--max-cpus", type=int, default=None,
+                        help="CPU budget shared by concurrently running stages (default: all CPUs).")
+    parser.add_argument("--cpus", action="append", default=[], metavar="STAGE=N",
+                        help="Override the CPU share of a stage, e.g. --cpus topics=4 (repeatable).")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run every stage even if its inputs and code are unchanged.")
+    args = parser.parse_args()
+
+    stage_names = {stage.name for stage in STAGES}
+    stage_cpus = {}
+    for item in args.cpus:
+        name, _, value = item.partition("=")
+        if name not in stage_names:
+            parser.error(f"--cpus got unknown stage '{name}' (choose from {', '.join(sorted(stage_names))})")
+        if not value.isdigit() or int(value) < 1:
+            parser.error(f"--cpus expects STAGE=N with N >= 1, got '{item}'")
+        stage_cpus[name] = int(value)
+
+    status = run_pipeline(max_cpus=args.max_cpus, force=args.force, cpus=stage_cpus)
+    sys.exit(0 if all(s in ("ran", "skipped") for s in status.values()) else 1)